@@ -1,13 +1,13 @@
-from flask import Flask, request, jsonify
+from flask import Flask, g, request, jsonify
+import hmac
 import logging
+import os
 from config import Config
-from quiz_solver import QuizSolver
+from logging_config import pop_chain_id, push_chain_id, setup_logging
+from warmup import get_llm_client, start_background_warmup
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Setup logging (queue-based, written to stdout by a background thread)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
@@ -17,9 +17,38 @@ try:
     Config.validate()
     logger.info("Configuration validated successfully")
 except ValueError as e:
-    logger.error(f"Configuration error: {e}")
+    logger.error("Configuration error: %s", e)
     logger.error("Please create a .env file with required values (see .env.example)")
 
+# Heavy modules (quiz_solver, pandas, parsers) are imported lazily so /health
+# is served immediately; warmup loads them before the first quiz arrives
+start_background_warmup()
+
+@app.before_request
+def start_correlation_id():
+    """Give every request its own chain id (worker threads are reused between requests)"""
+    g.chain_id_token = push_chain_id()
+
+@app.teardown_request
+def end_correlation_id(exc):
+    """Restore the previous chain id once the request is done"""
+    token = g.pop('chain_id_token', None)
+    if token is not None:
+        pop_chain_id(token)
+
+def is_admin(req):
+    """Check the admin token header (admin access is off unless ADMIN_TOKEN is set)"""
+    token = req.headers.get('X-Admin-Token')
+    if not Config.ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode(), Config.ADMIN_TOKEN.encode())
+
+def should_profile(req):
+    """Profiling is opt-in: via PROFILE_QUIZ, or an admin request with X-Profile: 1"""
+    if Config.PROFILE_QUIZ:
+        return True
+    return req.headers.get('X-Profile') == '1' and is_admin(req)
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
@@ -43,34 +72,72 @@ def handle_quiz():
 
         # Verify secret
         if data['secret'] != Config.SECRET:
-            logger.warning(f"Invalid secret received from {data.get('email')}")
+            logger.warning("Invalid secret received from %s", data.get('email'))
             return jsonify({"error": "Invalid secret"}), 403
 
         # Verify email matches
         if data['email'] != Config.EMAIL:
-            logger.warning(f"Email mismatch: {data['email']} != {Config.EMAIL}")
+            logger.warning("Email mismatch: %s != %s", data['email'], Config.EMAIL)
             return jsonify({"error": "Invalid email"}), 403
 
-        logger.info(f"Received valid quiz request for URL: {data['url']}")
+        logger.info("Received valid quiz request for URL: %s", data['url'])
 
         # Process the quiz asynchronously
-        quiz_url = data['url']
-        solver = QuizSolver()
+        from quiz_solver import QuizSolver
 
-        # Start solving the quiz (this will handle the chain of quizzes)
-        result = solver.solve_quiz_chain(quiz_url, data['email'], data['secret'])
+        quiz_url = data['url']
+        solver = QuizSolver(llm=get_llm_client())
 
-        return jsonify({
+        response = {
             "status": "processing",
             "message": "Quiz solving initiated",
             "initial_url": quiz_url
-        }), 200
+        }
+
+        # Start solving the quiz (this will handle the chain of quizzes)
+        if should_profile(request):
+            import profiler
+
+            job_id = profiler.new_job_id()
+            logger.info("Profiling quiz chain as job %s", job_id)
+            result, profiled = profiler.profile_call(
+                job_id, solver.solve_quiz_chain, quiz_url, data['email'], data['secret']
+            )
+            if profiled:
+                response["profile_id"] = job_id
+        else:
+            result = solver.solve_quiz_chain(quiz_url, data['email'], data['secret'])
+
+        return jsonify(response), 200
 
     except Exception as e:
-        logger.error(f"Error handling quiz request: {e}", exc_info=True)
+        logger.error("Error handling quiz request: %s", e, exc_info=True)
         return jsonify({"error": "Internal server error"}), 500
 
+@app.route('/admin/profiles', methods=['GET'])
+def list_profiles():
+    """List saved profiling reports (admin only)"""
+    if not is_admin(request):
+        return jsonify({"error": "Forbidden"}), 403
+
+    import profiler
+    return jsonify({"profiles": profiler.list_reports()}), 200
+
+@app.route('/admin/profiles/<job_id>', methods=['GET'])
+def get_profile(job_id):
+    """Fetch the profiling report for a job (admin only)"""
+    if not is_admin(request):
+        return jsonify({"error": "Forbidden"}), 403
+
+    import profiler
+    path = profiler.report_path(job_id)
+    if not path or not os.path.exists(path):
+        return jsonify({"error": "Profile not found"}), 404
+
+    with open(path, 'r') as f:
+        return f.read(), 200, {'Content-Type': 'text/plain; charset=utf-8'}
+
 if __name__ == '__main__':
     port = Config.PORT
-    logger.info(f"Starting Flask server on port {port}")
+    logger.info("Starting Flask server on port %s", port)
     app.run(host='0.0.0.0', port=port, debug=True)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Batch runner that solves many quiz chains concurrently
+
+Reads quiz jobs from a JSONL file (one {"url": ..., "email": ..., "secret": ...}
+object per line; email and secret default to the values in .env), runs
+QuizSolver chains with a bounded number of workers sharing one HTTP connection
+pool and one LLM client (each job gets its own session, so cookies are never
+shared between jobs), and streams a result line per job as each chain
+finishes.
+
+Usage:
+    python batch_runner.py jobs.jsonl -o results.jsonl -c 4
+"""
+import argparse
+import json
+import logging
+import math
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from browser import create_adapter, create_session
+from config import Config
+from llm_client import LLMClient
+from logging_config import setup_logging
+from quiz_solver import QuizSolver
+
+logger = logging.getLogger(__name__)
+
+def load_jobs(path):
+    """
+    Read quiz jobs from a JSONL file
+
+    Args:
+        path: Path to the JSONL file
+
+    Returns:
+        list: Job dicts with url, email and secret filled in
+    """
+    jobs = []
+    with open(path, 'r') as f:
+        for line_num, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning("Skipping line %d: invalid JSON (%s)", line_num, e)
+                continue
+            if not isinstance(data, dict):
+                logger.warning("Skipping line %d: not a JSON object", line_num)
+                continue
+            if not data.get('url'):
+                logger.warning("Skipping line %d: missing url", line_num)
+                continue
+            jobs.append({
+                "id": data.get('id', line_num),
+                "url": data['url'],
+                "email": data.get('email', Config.EMAIL),
+                "secret": data.get('secret', Config.SECRET),
+            })
+    return jobs
+
+def run_job(job, llm, adapter):
+    """Solve one quiz chain and return a result record"""
+    # Own cookie jar per job; the session isn't closed since that would close the shared pool
+    session = create_session(adapter=adapter)
+    solver = QuizSolver(llm=llm, session=session)
+    start = time.time()
+    record = {"id": job['id'], "url": job['url']}
+    try:
+        record["result"] = solver.solve_quiz_chain(job['url'], job['email'], job['secret'])
+        record["ok"] = bool(record["result"].get("success"))
+    except Exception as e:
+        logger.error("Job %s failed: %s", job['id'], e, exc_info=True)
+        record["error"] = str(e)
+        record["ok"] = False
+    record["elapsed"] = round(time.time() - start, 3)
+    return record
+
+def run_batch(jobs, output, concurrency=4):
+    """
+    Run quiz jobs concurrently and stream results to a file object
+
+    Args:
+        jobs: List of job dicts from load_jobs
+        output: Writable text file object for JSONL results
+        concurrency: Maximum number of chains solved at the same time
+
+    Returns:
+        dict: Aggregate throughput and latency stats
+    """
+    llm = LLMClient()
+    adapter = create_adapter(pool_size=concurrency)
+    latencies = []
+    succeeded = 0
+
+    start = time.time()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(run_job, job, llm, adapter) for job in jobs]
+            for future in as_completed(futures):
+                record = future.result()
+                latencies.append(record["elapsed"])
+                if record["ok"]:
+                    succeeded += 1
+                output.write(json.dumps(record, default=str) + "\n")
+                output.flush()
+    finally:
+        adapter.close()
+    wall_time = time.time() - start
+
+    return summarize(latencies, succeeded, wall_time)
+
+def summarize(latencies, succeeded, wall_time):
+    """Build aggregate stats from per-job latencies"""
+    stats = {
+        "jobs": len(latencies),
+        "succeeded": succeeded,
+        "failed": len(latencies) - succeeded,
+        "wall_time": round(wall_time, 3),
+        "throughput": round(len(latencies) / wall_time, 3) if wall_time > 0 else 0.0,
+    }
+    if latencies:
+        ordered = sorted(latencies)
+        stats.update({
+            "latency_min": ordered[0],
+            "latency_mean": round(statistics.mean(ordered), 3),
+            "latency_p50": round(statistics.median(ordered), 3),
+            # Nearest-rank percentile
+            "latency_p95": ordered[math.ceil(0.95 * len(ordered)) - 1],
+            "latency_max": ordered[-1],
+        })
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve quiz URLs from a JSONL file concurrently")
+    parser.add_argument('jobs', help="Input JSONL file with one quiz job per line")
+    parser.add_argument('-o', '--output', default='-', help="Output JSONL file (default: stdout)")
+    parser.add_argument('-c', '--concurrency', type=int, default=4, help="Number of chains to solve in parallel")
+    args = parser.parse_args(argv)
+
+    setup_logging(stream=sys.stderr)
+
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    jobs = load_jobs(args.jobs)
+    logger.info("Loaded %d job(s), concurrency=%d", len(jobs), args.concurrency)
+
+    if args.output == '-':
+        stats = run_batch(jobs, sys.stdout, args.concurrency)
+    else:
+        with open(args.output, 'w') as output:
+            stats = run_batch(jobs, output, args.concurrency)
+
+    print(json.dumps(stats, indent=2), file=sys.stderr)
+    return 0 if stats["failed"] == 0 else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,17 +2,45 @@ import requests
 import logging
 import base64
 import re
+from concurrent.futures import ThreadPoolExecutor
+from logging_config import VERBOSE
 
 logger = logging.getLogger(__name__)
 
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+def create_adapter(pool_size=10):
+    """Create an HTTP adapter whose connection pool can be mounted on several sessions"""
+    return requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+
+def create_session(pool_size=10, adapter=None):
+    """
+    Create a requests session that can be shared between BrowserHandlers
+
+    Args:
+        pool_size: Maximum number of pooled connections per host
+        adapter: Existing adapter to reuse, so sessions with separate cookie
+            jars share one connection pool (closing any of them closes it)
+
+    Returns:
+        requests.Session: Session with a sized connection pool
+    """
+    session = requests.Session()
+    adapter = adapter or create_adapter(pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({'User-Agent': USER_AGENT})
+    return session
+
 class BrowserHandler:
     """Handles HTTP requests to fetch and render quiz pages (without actual browser)"""
 
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+    def __init__(self, session=None):
+        # A shared session is owned by the caller and is not closed on exit
+        self._owns_session = session is None
+        self.session = session or create_session()
+        # URL of the last page fetched, after redirects
+        self.final_url = None
 
     def __enter__(self):
         """Context manager entry"""
@@ -20,7 +48,7 @@ class BrowserHandler:
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Context manager exit"""
-        if self.session:
+        if self.session and self._owns_session:
             self.session.close()
 
     def get_rendered_content(self, url, wait_time=3):
@@ -35,12 +63,13 @@ class BrowserHandler:
             str: The HTML content with decoded base64
         """
         try:
-            logger.info(f"Fetching URL: {url}")
+            logger.info("Fetching URL: %s", url)
             response = self.session.get(url, timeout=30)
             response.raise_for_status()
+            self.final_url = response.url
 
             html_content = response.text
-            logger.info(f"Fetched page, content length: {len(html_content)}")
+            logger.info("Fetched page, content length: %d", len(html_content))
 
             # Decode base64 content if present (common in quiz pages)
             # Look for atob() patterns and decode them
@@ -49,7 +78,7 @@ class BrowserHandler:
             return decoded_content
 
         except Exception as e:
-            logger.error(f"Error fetching page {url}: {e}", exc_info=True)
+            logger.error("Error fetching page %s: %s", url, e, exc_info=True)
             raise
 
     def _decode_base64_in_html(self, html):
@@ -63,41 +92,95 @@ class BrowserHandler:
             for base64_str in matches:
                 try:
                     decoded = base64.b64decode(base64_str).decode('utf-8', errors='ignore')
-                    logger.info(f"Decoded base64 content: {decoded[:200]}...")
+                    logger.debug("Decoded base64 content: %s", decoded, extra=VERBOSE)
                     # Add decoded content to HTML
                     result_html += f"\n<!-- Decoded Content -->\n{decoded}\n"
                 except Exception as e:
-                    logger.debug(f"Could not decode base64: {e}")
+                    logger.debug("Could not decode base64: %s", e)
 
             return result_html
 
         except Exception as e:
-            logger.error(f"Error decoding base64: {e}")
+            logger.error("Error decoding base64: %s", e)
             return html
 
-    def download_file(self, url, save_path):
+    def probe(self, url, timeout=5):
+        """
+        Look up an attachment's type and size without downloading it
+
+        Args:
+            url: The URL to probe
+            timeout: Seconds to wait; probes must stay cheap next to the quiz budget
+
+        Returns:
+            tuple: (content_type, content_length); either may be None if the
+                server doesn't say or doesn't support HEAD
+        """
+        try:
+            response = self.session.head(url, timeout=timeout, allow_redirects=True)
+            if response.status_code in (405, 501):
+                # HEAD not allowed: read the headers of a GET and drop the body
+                response = self.session.get(url, timeout=timeout, stream=True)
+                response.close()
+            response.raise_for_status()
+        except Exception as e:
+            logger.debug("Could not probe %s: %s", url, e)
+            return None, None
+
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower() or None
+        content_length = response.headers.get('Content-Length')
+        content_length = int(content_length) if content_length and content_length.isdigit() else None
+        return content_type, content_length
+
+    def probe_all(self, urls, max_workers=8):
+        """
+        Probe several URLs in parallel
+
+        Args:
+            urls: URLs to probe
+            max_workers: Maximum number of HEAD requests in flight
+
+        Returns:
+            list: (content_type, content_length) per URL, in the same order
+        """
+        if not urls:
+            return []
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as executor:
+            return list(executor.map(self.probe, urls))
+
+    def download_file(self, url, save_path, max_bytes=None):
         """
         Download a file from a URL
 
         Args:
             url: The URL of the file to download
             save_path: Where to save the file
+            max_bytes: Stop after this many bytes (the file is left truncated)
 
         Returns:
-            str: Path to the downloaded file
+            bool: True if the file was cut off at max_bytes
         """
         try:
-            logger.info(f"Downloading file from: {url}")
+            logger.info("Downloading file from: %s", url)
             response = self.session.get(url, timeout=60, stream=True)
             response.raise_for_status()
 
+            written = 0
+            truncated = False
             with open(save_path, 'wb') as f:
                 for chunk in response.iter_content(chunk_size=8192):
+                    if max_bytes is not None and written + len(chunk) > max_bytes:
+                        f.write(chunk[:max_bytes - written])
+                        logger.warning("Truncated download of %s at %d bytes", url, max_bytes)
+                        truncated = True
+                        break
                     f.write(chunk)
+                    written += len(chunk)
+            response.close()
 
-            logger.info(f"File downloaded successfully to: {save_path}")
-            return save_path
+            logger.info("File downloaded successfully to: %s", save_path)
+            return truncated
 
         except Exception as e:
-            logger.error(f"Error downloading file from {url}: {e}", exc_info=True)
+            logger.error("Error downloading file from %s: %s", url, e, exc_info=True)
             raise
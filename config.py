@@ -9,6 +9,27 @@ class Config:
     AIPIPE_API_KEY = os.getenv('AIPIPE_API_KEY')
     AIPIPE_BASE_URL = os.getenv('AIPIPE_BASE_URL', 'https://generativelanguage.googleapis.com/v1beta/openai/')
     PORT = int(os.getenv('PORT', 5000))
+    # Startup policy: 'background' warms up in a thread after the worker starts,
+    # 'preload' also imports heavy modules in the gunicorn master before forking,
+    # 'off' defers everything to the first quiz request
+    WARMUP = os.getenv('WARMUP', 'background').lower()
+    # Logging: 'text' or 'json' output, per-field size cap, and the fraction of
+    # verbose records (full pages, payloads, LLM output) that are emitted
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+    LOG_FIELD_MAX = int(os.getenv('LOG_FIELD_MAX', 500))
+    LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', 0.1))
+    # Profiling: PROFILE_QUIZ profiles every /quiz request; otherwise a request is
+    # profiled when it sends "X-Profile: 1" with a matching X-Admin-Token header.
+    # The admin header and endpoints are disabled unless ADMIN_TOKEN is set.
+    PROFILE_QUIZ = os.getenv('PROFILE_QUIZ', 'false').lower() in ('1', 'true', 'yes')
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+    PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+    PROFILE_TRACE_DEPTH = int(os.getenv('PROFILE_TRACE_DEPTH', 1))
+    PROFILE_MAX_REPORTS = int(os.getenv('PROFILE_MAX_REPORTS', 50))
+    # Attachments: larger CSV/text files are truncated, other types are skipped
+    ATTACHMENT_MAX_BYTES = int(os.getenv('ATTACHMENT_MAX_BYTES', 5 * 1024 * 1024))
+    MAX_ATTACHMENTS = int(os.getenv('MAX_ATTACHMENTS', 10))
 
     @classmethod
     def validate(cls):
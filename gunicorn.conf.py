@@ -0,0 +1,18 @@
+# Gunicorn picks this file up automatically from the working directory
+from config import Config
+from logging_config import setup_logging
+
+setup_logging()
+
+def when_ready(server):
+    """Pre-fork hook: import heavy modules once in the master so workers inherit them"""
+    if Config.WARMUP == 'preload':
+        from warmup import log_timings, preload_modules
+        log_timings(preload_modules())
+
+def post_fork(server, worker):
+    """Open the LLM connection in each worker (connections must not cross a fork)"""
+    from warmup import start_background_warmup
+    # The master's log listener thread doesn't survive the fork
+    setup_logging()
+    start_background_warmup()
@@ -1,6 +1,7 @@
 from openai import OpenAI
 import logging
 from config import Config
+from logging_config import VERBOSE
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +28,7 @@ class LLMClient:
             str: The LLM's answer
         """
         try:
-            logger.info(f"Sending question to LLM: {question_text[:200]}...")
+            logger.info("Sending question to LLM: %s", question_text, extra=VERBOSE)
 
             # Build the prompt
             system_prompt = """You are a data analysis expert helping to solve quiz questions.
@@ -63,12 +64,12 @@ Do not include explanations unless specifically asked. Just provide the answer."
             )
 
             answer = response.choices[0].message.content.strip()
-            logger.info(f"LLM response: {answer}")
+            logger.info("LLM response: %s", answer, extra=VERBOSE)
 
             return answer
 
         except Exception as e:
-            logger.error(f"Error calling LLM API: {e}", exc_info=True)
+            logger.error("Error calling LLM API: %s", e, exc_info=True)
             raise
 
     def extract_answer_format(self, question_text, raw_answer):
@@ -112,5 +113,5 @@ Do not include explanations unless specifically asked. Just provide the answer."
             return raw_answer.strip()
 
         except Exception as e:
-            logger.warning(f"Error formatting answer, returning raw: {e}")
+            logger.warning("Error formatting answer, returning raw: %s", e)
             return raw_answer
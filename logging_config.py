@@ -0,0 +1,149 @@
+import atexit
+import contextlib
+import contextvars
+import json
+import logging
+import logging.handlers
+import numbers
+import os
+import queue
+import random
+import sys
+import uuid
+from config import Config
+
+# Correlation id of the quiz chain being solved in the current thread/context
+chain_id_var = contextvars.ContextVar('chain_id', default='-')
+
+# Pass as extra= on records carrying full pages, payloads or LLM output;
+# only a sample of them is emitted (see Config.LOG_SAMPLE_RATE)
+VERBOSE = {'verbose': True}
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(chain_id)s] %(message)s'
+
+_listener = None
+_listener_pid = None
+
+def push_chain_id():
+    """Start a new correlation id for the current context and return the reset token"""
+    return chain_id_var.set(uuid.uuid4().hex[:8])
+
+def pop_chain_id(token):
+    """Restore the correlation id that was active before push_chain_id"""
+    chain_id_var.reset(token)
+
+@contextlib.contextmanager
+def chain_context():
+    """Tag records in the block with a correlation id, reusing the caller's if one is active"""
+    if chain_id_var.get() != '-':
+        yield
+        return
+    token = push_chain_id()
+    try:
+        yield
+    finally:
+        pop_chain_id(token)
+
+class ContextFilter(logging.Filter):
+    """Stamps records with the current chain id and drops unsampled verbose records"""
+
+    def __init__(self, sample_rate=1.0):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record):
+        record.chain_id = chain_id_var.get()
+        if getattr(record, 'verbose', False) and self.sample_rate < 1.0:
+            return random.random() < self.sample_rate
+        return True
+
+class TruncatingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that defers formatting to the listener thread
+
+    The stock QueueHandler formats the message in the calling thread. Here the
+    caller only bounds the size of each argument, so the cost on the hot path
+    does not grow with page, payload or answer size.
+    """
+
+    def __init__(self, q, max_field_size):
+        super().__init__(q)
+        self.max_field_size = max_field_size
+
+    def _truncate(self, value):
+        if isinstance(value, str):
+            if len(value) > self.max_field_size:
+                return f"{value[:self.max_field_size]}...[{len(value)} chars]"
+            return value
+        # Numbers keep their type so %d / %.2f placeholders still work
+        if value is None or isinstance(value, numbers.Number):
+            return value
+        return self._truncate(str(value))
+
+    def prepare(self, record):
+        if not record.args and isinstance(record.msg, str) and len(record.msg) > self.max_field_size:
+            record.msg = self._truncate(record.msg)
+        if isinstance(record.args, tuple):
+            record.args = tuple(self._truncate(arg) for arg in record.args)
+        elif isinstance(record.args, dict):
+            # logging unpacks a lone dict argument as named arguments; only
+            # keep it that way when the message actually uses %(name)s
+            if '%(' in str(record.msg):
+                record.args = {key: self._truncate(arg) for key, arg in record.args.items()}
+            else:
+                record.args = (self._truncate(record.args),)
+        if record.exc_info and not record.exc_text:
+            # Traceback objects must be rendered before the frames go away
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "chain_id": getattr(record, 'chain_id', '-'),
+            "message": record.getMessage(),
+        }
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+def setup_logging(stream=None):
+    """
+    Route all logging through a queue drained by a background thread
+
+    Safe to call more than once; it reconfigures after a fork since the
+    listener thread does not survive into the child process.
+
+    Args:
+        stream: Where the listener writes (defaults to stdout)
+    """
+    global _listener, _listener_pid
+    if _listener is not None and _listener_pid == os.getpid():
+        return
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    if Config.LOG_FORMAT == 'json':
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    handler = TruncatingQueueHandler(log_queue, Config.LOG_FIELD_MAX)
+    handler.addFilter(ContextFilter(Config.LOG_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(Config.LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(log_queue, output)
+    _listener_pid = os.getpid()
+    _listener.start()
+    atexit.register(_listener.stop)
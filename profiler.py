@@ -0,0 +1,120 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# cProfile and tracemalloc are process-wide, so only one job is profiled at a time
+_profile_lock = threading.Lock()
+
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+def new_job_id():
+    """Return an id for a profiled job"""
+    return uuid.uuid4().hex
+
+def report_path(job_id):
+    """
+    Return the report file path for a job id
+
+    Args:
+        job_id: Id returned by new_job_id
+
+    Returns:
+        str: Path to the report, or None if the id is malformed
+    """
+    if not JOB_ID_PATTERN.match(job_id or ''):
+        return None
+    return os.path.join(Config.PROFILE_DIR, f"{job_id}.txt")
+
+def list_reports():
+    """Return the ids of saved reports, newest first"""
+    if not os.path.isdir(Config.PROFILE_DIR):
+        return []
+    paths = [
+        os.path.join(Config.PROFILE_DIR, name)
+        for name in os.listdir(Config.PROFILE_DIR)
+        if JOB_ID_PATTERN.match(name[:-4]) and name.endswith('.txt')
+    ]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    return [os.path.basename(path)[:-4] for path in paths]
+
+def profile_call(job_id, func, *args, **kwargs):
+    """
+    Run func under cProfile and tracemalloc and save a report for the job
+
+    If another job is already being profiled, func runs unprofiled.
+
+    Args:
+        job_id: Id used to name the report file
+        func: Callable to profile
+
+    Returns:
+        tuple: (whatever func returns, True if a report was saved)
+    """
+    if not _profile_lock.acquire(blocking=False):
+        logger.warning("Profiler busy, running job %s without profiling", job_id)
+        return func(*args, **kwargs), False
+
+    profile = cProfile.Profile()
+    saved = False
+    try:
+        tracemalloc.start(Config.PROFILE_TRACE_DEPTH)
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            profile.disable()
+            elapsed = time.perf_counter() - start
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            try:
+                path = write_report(job_id, profile, snapshot, elapsed, current, peak)
+                saved = True
+                logger.info("Saved profile for job %s to %s", job_id, path)
+                prune_reports()
+            except Exception as e:
+                logger.error("Could not save profile for job %s: %s", job_id, e)
+    finally:
+        _profile_lock.release()
+    return result, saved
+
+def prune_reports():
+    """Delete the oldest reports beyond Config.PROFILE_MAX_REPORTS"""
+    for job_id in list_reports()[Config.PROFILE_MAX_REPORTS:]:
+        try:
+            os.remove(report_path(job_id))
+        except OSError as e:
+            logger.warning("Could not delete old profile %s: %s", job_id, e)
+
+def write_report(job_id, profile, snapshot, elapsed, current, peak, limit=40):
+    """Write the cProfile and tracemalloc summary for a job to its report file"""
+    out = io.StringIO()
+    out.write(f"Job: {job_id}\n")
+    out.write(f"Wall time: {elapsed:.3f}s\n")
+    out.write(f"Memory: peak {peak / 1024 / 1024:.2f} MiB, "
+              f"still allocated {current / 1024 / 1024:.2f} MiB\n\n")
+
+    out.write("=== Functions by cumulative time ===\n")
+    stats = pstats.Stats(profile, stream=out)
+    stats.sort_stats('cumulative').print_stats(limit)
+
+    out.write("\n=== Top allocation sites (live at end of job) ===\n")
+    for stat in snapshot.statistics('lineno')[:limit]:
+        out.write(f"{stat}\n")
+
+    os.makedirs(Config.PROFILE_DIR, exist_ok=True)
+    path = report_path(job_id)
+    with open(path, 'w') as f:
+        f.write(out.getvalue())
+    return path
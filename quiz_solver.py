@@ -3,18 +3,62 @@ import logging
 import time
 import re
 import os
+import tempfile
 from bs4 import BeautifulSoup
 from browser import BrowserHandler
 from llm_client import LLMClient
+from logging_config import VERBOSE, chain_context
+from config import Config
 from datetime import datetime
+from urllib.parse import parse_qs, urldefrag, urljoin, urlparse
 
 logger = logging.getLogger(__name__)
 
+# File types process_files knows how to parse
+DATA_EXTENSIONS = {'pdf', 'csv', 'xlsx', 'json', 'txt', 'xml'}
+
+# Text formats that are still useful when cut off at the size budget
+TRUNCATABLE_EXTENSIONS = {'csv', 'txt'}
+
+CONTENT_TYPE_EXTENSIONS = {
+    'text/csv': 'csv',
+    'application/csv': 'csv',
+    'application/json': 'json',
+    'application/pdf': 'pdf',
+    'text/plain': 'txt',
+    'application/xml': 'xml',
+    'text/xml': 'xml',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': 'xlsx',
+}
+
+# Whole words in an extensionless link's path segments, query or text that
+# suggest it serves data
+DOWNLOAD_HINTS = {'download', 'export', 'csv', 'json', 'pdf', 'xlsx'}
+DOWNLOAD_HINT_PATTERN = re.compile(r'\b(?:' + '|'.join(sorted(DOWNLOAD_HINTS)) + r')\b')
+
+def url_extension(url):
+    """Return the lowercase file extension of a URL's path, ignoring query and fragment"""
+    return os.path.splitext(urlparse(url).path)[1].lstrip('.').lower()
+
+def drop_partial_last_line(filename):
+    """Cut a truncated text file back to its last complete line"""
+    with open(filename, 'rb+') as f:
+        data = f.read()
+        last_newline = data.rfind(b'\n')
+        if last_newline != -1:
+            f.truncate(last_newline + 1)
+
 class QuizSolver:
     """Main class for solving quiz questions"""
 
-    def __init__(self):
-        self.llm = LLMClient()
+    def __init__(self, llm=None, session=None):
+        """
+        Args:
+            llm: Optional LLMClient to reuse (e.g. shared across batch jobs)
+            session: Optional requests.Session whose connection pool is reused
+        """
+        self.llm = llm or LLMClient()
+        self.session = session
         self.start_time = None
         self.max_time = 180  # 3 minutes in seconds
 
@@ -28,14 +72,20 @@ class QuizSolver:
             secret: Student secret
 
         Returns:
-            dict: Final result
+            dict: Final result, with "success" True only if the chain was
+                completed with a correct last answer
         """
+        with chain_context():
+            return self._solve_quiz_chain(initial_url, email, secret)
+
+    def _solve_quiz_chain(self, initial_url, email, secret):
+        """Run the chain; solve_quiz_chain wraps it in a correlation id"""
         self.start_time = time.time()
         current_url = initial_url
         attempt = 0
         max_attempts = 5  # Limit to 5 attempts to avoid rate limiting
 
-        logger.info(f"Starting quiz chain from: {initial_url}")
+        logger.info("Starting quiz chain from: %s", initial_url)
 
         while current_url and attempt < max_attempts:
             attempt += 1
@@ -43,28 +93,28 @@ class QuizSolver:
             # Check if we're within time limit
             elapsed_time = time.time() - self.start_time
             if elapsed_time > self.max_time:
-                logger.error(f"Time limit exceeded: {elapsed_time:.2f}s")
+                logger.error("Time limit exceeded: %.2fs", elapsed_time)
                 break
 
-            logger.info(f"Attempt {attempt}: Processing {current_url}")
+            logger.info("Attempt %d: Processing %s", attempt, current_url)
 
             try:
                 # Solve the current quiz
                 result = self.solve_single_quiz(current_url, email, secret)
 
                 if result.get('correct'):
-                    logger.info(f"✓ Correct answer for {current_url}")
+                    logger.info("✓ Correct answer for %s", current_url)
                     # Move to next URL if provided
                     current_url = result.get('url')
                     if not current_url:
                         logger.info("No more URLs, quiz chain completed!")
-                        return result
+                        return {**result, "success": True}
                 else:
-                    logger.warning(f"✗ Incorrect answer: {result.get('reason')}")
+                    logger.warning("✗ Incorrect answer: %s", result.get('reason'))
                     # The response might still give us a next URL
                     next_url = result.get('url')
                     if next_url and next_url != current_url:
-                        logger.info(f"Moving to next quiz despite error: {next_url}")
+                        logger.info("Moving to next quiz despite error: %s", next_url)
                         current_url = next_url
                     else:
                         logger.info("No new URL provided, retrying same quiz")
@@ -72,11 +122,11 @@ class QuizSolver:
                         time.sleep(1)  # Brief pause before retry
 
             except Exception as e:
-                logger.error(f"Error solving quiz {current_url}: {e}", exc_info=True)
+                logger.error("Error solving quiz %s: %s", current_url, e, exc_info=True)
                 break
 
-        logger.info(f"Quiz chain ended after {attempt} attempts")
-        return {"status": "completed", "attempts": attempt}
+        logger.info("Quiz chain ended after %d attempts", attempt)
+        return {"status": "completed", "attempts": attempt, "success": False}
 
     def solve_single_quiz(self, quiz_url, email, secret):
         """
@@ -90,11 +140,13 @@ class QuizSolver:
         Returns:
             dict: Response from submit endpoint
         """
-        logger.info(f"Fetching quiz from: {quiz_url}")
+        logger.info("Fetching quiz from: %s", quiz_url)
 
         # Step 1: Render the page with a headless browser
-        with BrowserHandler() as browser:
+        with BrowserHandler(self.session) as browser:
             html_content = browser.get_rendered_content(quiz_url)
+            # Relative links resolve against the page actually served (after redirects)
+            page_url = browser.final_url or quiz_url
 
         # Step 2: Parse the HTML to extract the question
         soup = BeautifulSoup(html_content, 'html.parser')
@@ -115,18 +167,18 @@ class QuizSolver:
             if decoded_match:
                 question_text = decoded_match.group(1).strip()
 
-        logger.info(f"Extracted question text:\n{question_text}")
+        logger.info("Extracted question text:\n%s", question_text, extra=VERBOSE)
 
         # Step 3: Extract submit URL and any file URLs from the question
-        submit_url = self.extract_submit_url(question_text, html_content, quiz_url)
-        logger.info(f"Submit URL: {submit_url}")
+        submit_url = self.extract_submit_url(question_text, html_content, page_url)
+        logger.info("Submit URL: %s", submit_url)
 
         # Step 4: Check if there are any files to download
-        file_urls = self.extract_file_urls(html_content)
+        file_urls = self.extract_file_urls(html_content, page_url, exclude=(quiz_url, page_url, submit_url))
         context = None
 
         if file_urls:
-            logger.info(f"Found {len(file_urls)} file(s) to process")
+            logger.info("Found %d file(s) to process", len(file_urls))
             context = self.process_files(file_urls)
 
         # Step 5: Use LLM to solve the question
@@ -135,7 +187,7 @@ class QuizSolver:
         # Step 6: Format the answer appropriately
         formatted_answer = self.llm.extract_answer_format(question_text, raw_answer)
 
-        logger.info(f"Formatted answer: {formatted_answer} (type: {type(formatted_answer).__name__})")
+        logger.info("Formatted answer: %s (type: %s)", formatted_answer, type(formatted_answer).__name__)
 
         # Step 7: Submit the answer
         result = self.submit_answer(submit_url, email, secret, quiz_url, formatted_answer)
@@ -144,8 +196,6 @@ class QuizSolver:
 
     def extract_submit_url(self, text, html, base_url):
         """Extract the submit URL from the question text or HTML"""
-        from urllib.parse import urljoin
-
         # Look for absolute URLs first
         patterns = [
             r'Post your answer to (https?://[^\s]+)',
@@ -171,7 +221,7 @@ class QuizSolver:
             if match:
                 relative_url = match.group(1).rstrip('.,;:')
                 absolute_url = urljoin(base_url, relative_url)
-                logger.info(f"Found relative URL '{relative_url}', converted to: {absolute_url}")
+                logger.info("Found relative URL '%s', converted to: %s", relative_url, absolute_url)
                 return absolute_url
 
         # Fallback: look for any absolute URL that looks like a submit endpoint
@@ -183,20 +233,110 @@ class QuizSolver:
         logger.warning("Could not find submit URL in question text")
         return None
 
-    def extract_file_urls(self, html):
-        """Extract file URLs (PDF, CSV, etc.) from HTML"""
+    def extract_file_urls(self, html, base_url=None, exclude=()):
+        """
+        Extract data file URLs (PDF, CSV, etc.) from HTML
+
+        Links are resolved against base_url, stripped of fragments and
+        deduplicated. Links without a data file extension are kept only when
+        they look like downloads; their type is settled by process_files.
+
+        Args:
+            html: Page HTML
+            base_url: URL of the page, used to resolve relative links (a
+                <base href> on the page takes precedence)
+            exclude: URLs to leave out (e.g. the quiz and submit URLs)
+
+        Returns:
+            list: Absolute file URLs in page order
+        """
         soup = BeautifulSoup(html, 'html.parser')
+        base_tag = soup.find('base', href=True)
+        if base_tag:
+            base_url = urljoin(base_url or '', base_tag['href'].strip())
+        excluded = {urldefrag(url)[0] for url in exclude if url}
         file_urls = []
+        seen = set()
 
         # Find all links
         for link in soup.find_all('a', href=True):
-            href = link['href']
-            # Check if it's a data file
-            if any(ext in href.lower() for ext in ['.pdf', '.csv', '.xlsx', '.json', '.txt', '.xml']):
-                file_urls.append(href)
+            href = link['href'].strip()
+            if not href or href.startswith(('#', 'mailto:', 'javascript:')):
+                continue
+
+            url = urldefrag(urljoin(base_url or '', href))[0]
+            if urlparse(url).scheme not in ('http', 'https') or url in seen or url in excluded:
+                continue
+
+            # Check if it's a data file, or a link that looks like a download
+            if url_extension(url) in DATA_EXTENSIONS or self._looks_like_download(link, url):
+                seen.add(url)
+                file_urls.append(url)
 
         return file_urls
 
+    def _looks_like_download(self, link, url):
+        """Heuristic for data links whose URL has no file extension"""
+        if url_extension(url):
+            return False
+        if link.has_attr('download'):
+            return True
+        parsed = urlparse(url)
+        segments = {segment.lower() for segment in parsed.path.split('/')}
+        query_values = {value.lower() for values in parse_qs(parsed.query).values() for value in values}
+        if segments & DOWNLOAD_HINTS or query_values & DOWNLOAD_HINTS:
+            return True
+        return bool(DOWNLOAD_HINT_PATTERN.search(link.get_text(' ', strip=True).lower()))
+
+    def plan_attachments(self, browser, file_urls):
+        """
+        Decide how to handle each attachment before downloading it
+
+        Uses HEAD (Content-Type and Content-Length) to route each URL to a
+        parser and check it against the size budget.
+
+        Args:
+            browser: BrowserHandler used for the HEAD requests
+            file_urls: URLs from extract_file_urls
+
+        Returns:
+            tuple: (list of (url, ext) to download, list of (url, reason) skipped
+                over the budget). Links that turn out not to be data files are
+                only logged.
+        """
+        planned = []
+        skipped = []
+
+        # Probe in parallel, and never more links than could plausibly be used
+        probe_limit = Config.MAX_ATTACHMENTS * 2
+        probes = browser.probe_all(file_urls[:probe_limit])
+        for url in file_urls[probe_limit:]:
+            skipped.append((url, f"attachment limit of {Config.MAX_ATTACHMENTS} reached"))
+
+        for url, (content_type, content_length) in zip(file_urls, probes):
+            if len(planned) >= Config.MAX_ATTACHMENTS:
+                skipped.append((url, f"attachment limit of {Config.MAX_ATTACHMENTS} reached"))
+                continue
+
+            # A data extension in the URL decides; servers often mislabel these
+            # (e.g. CSV as text/plain or application/vnd.ms-excel). Content-Type
+            # only routes links without one.
+            ext = url_extension(url)
+            if ext not in DATA_EXTENSIONS:
+                ext = CONTENT_TYPE_EXTENSIONS.get(content_type)
+            if ext not in DATA_EXTENSIONS:
+                logger.info("Ignoring link %s: not a data file (Content-Type: %s)", url, content_type or 'unknown')
+                continue
+
+            if (content_length is not None and content_length > Config.ATTACHMENT_MAX_BYTES
+                    and ext not in TRUNCATABLE_EXTENSIONS):
+                skipped.append((url, f"{content_length} bytes exceeds budget of {Config.ATTACHMENT_MAX_BYTES} bytes"))
+                continue
+
+            planned.append((url, ext))
+
+        return planned, skipped
+
     def process_files(self, file_urls):
         """
         Download and process data files
@@ -209,15 +349,23 @@ class QuizSolver:
         """
         context_parts = []
 
-        with BrowserHandler() as browser:
-            for url in file_urls:
-                try:
-                    # Determine file type
-                    ext = url.split('.')[-1].lower()
-                    filename = f"temp_file.{ext}"
+        with BrowserHandler(self.session) as browser:
+            planned, skipped = self.plan_attachments(browser, file_urls)
 
-                    # Download file
-                    browser.download_file(url, filename)
+            for url, ext in planned:
+                fd, filename = tempfile.mkstemp(suffix=f".{ext}")
+                os.close(fd)
+                try:
+                    # Download file, never more than the budget
+                    truncated = browser.download_file(url, filename, max_bytes=Config.ATTACHMENT_MAX_BYTES)
+                    if truncated:
+                        if ext not in TRUNCATABLE_EXTENSIONS:
+                            skipped.append((url, f"exceeds budget of {Config.ATTACHMENT_MAX_BYTES} bytes"))
+                            continue
+                        drop_partial_last_line(filename)
+                        context_parts.append(
+                            f"Note: {url} was truncated to the first {Config.ATTACHMENT_MAX_BYTES} bytes"
+                        )
 
                     # Process based on file type
                     if ext == 'csv':
@@ -225,7 +373,7 @@ class QuizSolver:
                         df = pd.read_csv(filename)
                         context_parts.append(f"CSV Data:\n{df.to_string()}")
 
-                    elif ext in ['xlsx', 'xls']:
+                    elif ext == 'xlsx':
                         import pandas as pd
                         # Read all sheets
                         excel_file = pd.ExcelFile(filename)
@@ -239,10 +387,11 @@ class QuizSolver:
                             data = json.load(f)
                         context_parts.append(f"JSON Data:\n{json.dumps(data, indent=2)}")
 
-                    elif ext == 'txt':
-                        with open(filename, 'r') as f:
+                    elif ext in ['txt', 'xml']:
+                        with open(filename, 'r', errors='replace') as f:
                             content = f.read()
-                        context_parts.append(f"Text File:\n{content}")
+                        label = "XML File" if ext == 'xml' else "Text File"
+                        context_parts.append(f"{label}:\n{content}")
 
                     elif ext == 'pdf':
                         # Parse PDF file
@@ -255,15 +404,23 @@ class QuizSolver:
                                 pdf_text.append(f"Page {page_num}:\n{text}")
                             context_parts.append(f"PDF Content:\n" + "\n\n".join(pdf_text))
                         except Exception as pdf_error:
-                            logger.error(f"Error parsing PDF: {pdf_error}")
+                            logger.error("Error parsing PDF: %s", pdf_error)
                             context_parts.append(f"PDF file downloaded but could not be parsed: {url}")
 
+                except Exception as e:
+                    logger.error("Error processing file %s: %s", url, e)
+
+                finally:
                     # Clean up
                     if os.path.exists(filename):
                         os.remove(filename)
 
-                except Exception as e:
-                    logger.error(f"Error processing file {url}: {e}")
+        if skipped:
+            for url, reason in skipped:
+                logger.warning("Skipped attachment %s: %s", url, reason)
+            context_parts.append(
+                "Skipped attachments:\n" + "\n".join(f"- {url}: {reason}" for url, reason in skipped)
+            )
 
         return "\n\n".join(context_parts) if context_parts else None
 
@@ -293,20 +450,21 @@ class QuizSolver:
         }
 
         try:
-            logger.info(f"Submitting answer to: {submit_url}")
-            logger.info(f"Payload: {payload}")
+            logger.info("Submitting answer to: %s", submit_url)
+            logger.info("Payload: %s", payload, extra=VERBOSE)
 
-            response = requests.post(submit_url, json=payload, timeout=30)
+            http = self.session or requests
+            response = http.post(submit_url, json=payload, timeout=30)
 
-            logger.info(f"Response status: {response.status_code}")
-            logger.info(f"Response body: {response.text}")
+            logger.info("Response status: %d", response.status_code)
+            logger.info("Response body: %s", response.text, extra=VERBOSE)
 
             if response.status_code == 200:
                 return response.json()
             else:
-                logger.error(f"Submit failed with status {response.status_code}")
+                logger.error("Submit failed with status %d", response.status_code)
                 return {"error": f"HTTP {response.status_code}", "correct": False}
 
         except Exception as e:
-            logger.error(f"Error submitting answer: {e}", exc_info=True)
+            logger.error("Error submitting answer: %s", e, exc_info=True)
             return {"error": str(e), "correct": False}
@@ -0,0 +1,99 @@
+import importlib
+import logging
+import threading
+import time
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Modules that are otherwise imported on the first /quiz request,
+# in the order they are needed while solving
+PRELOAD_MODULES = [
+    'bs4',
+    'openai',
+    'quiz_solver',
+    'pandas',
+    'openpyxl',
+    'PyPDF2',
+]
+
+_llm_client = None
+_llm_lock = threading.Lock()
+_warmup_lock = threading.Lock()
+_warmup_started = False
+
+def get_llm_client():
+    """Return the process-wide LLMClient, creating it on first use"""
+    global _llm_client
+    if _llm_client is None:
+        with _llm_lock:
+            if _llm_client is None:
+                from llm_client import LLMClient
+                _llm_client = LLMClient()
+    return _llm_client
+
+def preload_modules(modules=None):
+    """
+    Import heavy modules ahead of time and measure how long each takes
+
+    Args:
+        modules: Module names to import (defaults to PRELOAD_MODULES)
+
+    Returns:
+        dict: Module name -> import time in seconds (None if the import failed)
+    """
+    timings = {}
+    for name in modules or PRELOAD_MODULES:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+            timings[name] = time.perf_counter() - start
+        except Exception as e:
+            logger.warning("Could not preload %s: %s", name, e)
+            timings[name] = None
+    return timings
+
+def warm_llm_connection():
+    """Create the shared LLM client and open its connection to the API"""
+    start = time.perf_counter()
+    try:
+        client = get_llm_client()
+        # Any cheap authenticated call establishes the TLS connection in the pool
+        client.client.with_options(timeout=10, max_retries=0).models.list()
+    except Exception as e:
+        logger.warning("LLM connection warmup failed: %s", e)
+    return time.perf_counter() - start
+
+def log_timings(timings):
+    """Report import times at startup"""
+    total = sum(t for t in timings.values() if t is not None)
+    details = ", ".join(
+        f"{name}={t * 1000:.0f}ms" if t is not None else f"{name}=failed"
+        for name, t in timings.items()
+    )
+    logger.info("Preloaded modules in %.2fs (%s)", total, details)
+
+def warmup(connect=True):
+    """
+    Preload parsers and the LLM client so the first quiz doesn't pay for them
+
+    Args:
+        connect: Also open the LLM API connection (skip before forking)
+    """
+    log_timings(preload_modules())
+    if connect:
+        elapsed = warm_llm_connection()
+        logger.info("LLM client warmed up in %.2fs", elapsed)
+
+def start_background_warmup():
+    """Run warmup in a daemon thread once per process unless Config.WARMUP is 'off'"""
+    global _warmup_started
+    if Config.WARMUP == 'off':
+        return None
+    with _warmup_lock:
+        if _warmup_started:
+            return None
+        _warmup_started = True
+    thread = threading.Thread(target=warmup, name='warmup', daemon=True)
+    thread.start()
+    return thread